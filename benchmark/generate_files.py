@@ -5,190 +5,83 @@ Fast file generator for fd-mcp benchmarks
 import os
 import sys
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 
-def create_file(filepath, content):
-    """Create a file with the given content"""
-    with open(filepath, 'w') as f:
-        f.write(content)
-
-
-def main():
-    parser = argparse.ArgumentParser(description='Generate benchmark test files')
-    parser.add_argument('-n', '--num-files', type=int, default=100000,
-                       help='Number of files to generate (default: 100000)')
-    args = parser.parse_args()
-
-    file_count = args.num_files
-
-    if file_count < 100:
-        print(f"Error: File count must be >= 100")
-        sys.exit(1)
-
-    # Setup paths
-    script_dir = Path(__file__).parent
-    test_data_dir = script_dir / 'test_data'
-
-    print(f"🔧 Setting up benchmark test data...")
-    print(f"📊 Target file count: {file_count}")
-
-    # Clean and create directories
-    if test_data_dir.exists():
-        print("Removing existing test data...")
-        import shutil
-        shutil.rmtree(test_data_dir)
-
-    dirs = ['src', 'tests', 'docs', 'config', 'scripts', 'lib', 'examples']
-    for dir_name in dirs:
-        (test_data_dir / dir_name).mkdir(parents=True, exist_ok=True)
-
-    print(f"📁 Creating {file_count} test files...")
-
-    # Calculate file distribution
-    py_src_files = int(file_count * 0.15)
-    py_helpers = int(file_count * 0.05)
-    test_files = int(file_count * 0.15)
-    js_components = int(file_count * 0.10)
-    js_utils = int(file_count * 0.05)
-    json_config = int(file_count * 0.05)
-    yaml_config = int(file_count * 0.05)
-    docs = int(file_count * 0.10)
-    scripts = int(file_count * 0.08)
-    py_lib = int(file_count * 0.04)
-    js_lib = int(file_count * 0.03)
-    examples = int(file_count * 0.10)
-    txt_files = int(file_count * 0.03)
-    env_files = int(file_count * 0.01)
-    readme_files = int(file_count * 0.01)
-
-    total_allocated = (py_src_files + py_helpers + test_files + js_components + js_utils +
-                      json_config + yaml_config + docs + scripts + py_lib + js_lib +
-                      examples + txt_files + env_files + readme_files)
-    remaining = file_count - total_allocated
-    legacy_files = int(remaining * 0.6)
-    integration_tests = remaining - legacy_files
-
-    count = 0
-
-    # 1. Python source files
-    if py_src_files > 0:
-        print(f"  Creating Python source files ({py_src_files} files)...")
-        for i in range(1, py_src_files + 1):
-            create_file(test_data_dir / 'src' / f'module_{i}.py',
-                       f"""class Module{i}:
+# File templates, pre-encoded once; %(i)d is replaced with the file's index
+PYTHON_SRC_TPL = b"""class Module%(i)d:
     def __init__(self):
-        self.value = {i}
+        self.value = %(i)d
 
     def process(self):
-        return self.value * 2""")
-            count += 1
-
-    # 2. Python helpers
-    if py_helpers > 0:
-        print(f"  Creating Python helper files ({py_helpers} files)...")
-        for i in range(1, py_helpers + 1):
-            create_file(test_data_dir / 'src' / f'helper_{i}.py',
-                       f"""# Helper module {i}
-def helper_function_{i}(x):
+        return self.value * 2"""
+
+PYTHON_HELPERS_TPL = b"""# Helper module %(i)d
+def helper_function_%(i)d(x):
     # TODO: Implement logic
-    return x + {i}
+    return x + %(i)d
 
 def another_helper(y):
     # FIXME: This needs optimization
-    return y * {i}""")
-            count += 1
-
-    # 3. Test files
-    if test_files > 0:
-        print(f"  Creating test files ({test_files} files)...")
-        for i in range(1, test_files + 1):
-            create_file(test_data_dir / 'tests' / f'test_module_{i}.py',
-                       f"""import unittest
-from src.module_{i} import Module{i}
-
-class TestModule{i}(unittest.TestCase):
+    return y * %(i)d"""
+
+TESTS_TPL = b"""import unittest
+from src.module_%(i)d import Module%(i)d
+
+class TestModule%(i)d(unittest.TestCase):
     def test_init(self):
         # TODO: Add more tests
-        obj = Module{i}()
-        self.assertEqual(obj.value, {i})
+        obj = Module%(i)d()
+        self.assertEqual(obj.value, %(i)d)
 
     def test_process(self):
-        obj = Module{i}()
+        obj = Module%(i)d()
         result = obj.process()
-        self.assertEqual(result, {i} * 2)""")
-            count += 1
-
-    # 4. JavaScript components
-    if js_components > 0:
-        print(f"  Creating JavaScript component files ({js_components} files)...")
-        for i in range(1, js_components + 1):
-            create_file(test_data_dir / 'src' / f'component_{i}.js',
-                       f"""export class Component{i} {{
-    constructor() {{
-        this.state = {{ value: {i} }};
-    }}
-
-    render() {{
+        self.assertEqual(result, %(i)d * 2)"""
+
+JS_COMPONENTS_TPL = b"""export class Component%(i)d {
+    constructor() {
+        this.state = { value: %(i)d };
+    }
+
+    render() {
         // TODO: Implement render logic
         return this.state.value;
-    }}
-}}""")
-            count += 1
-
-    # 5. JavaScript utilities
-    if js_utils > 0:
-        print(f"  Creating JavaScript utility files ({js_utils} files)...")
-        for i in range(1, js_utils + 1):
-            create_file(test_data_dir / 'src' / f'util_{i}.js',
-                       f"""// Utility functions
-export function calculateValue{i}(x) {{
+    }
+}"""
+
+JS_UTILS_TPL = b"""// Utility functions
+export function calculateValue%(i)d(x) {
     // FIXME: Error handling needed
-    return x * {i};
-}}
-
-export function processData{i}(data) {{
-    return data.map(x => x + {i});
-}}""")
-            count += 1
-
-    # 6. JSON config
-    if json_config > 0:
-        print(f"  Creating JSON config files ({json_config} files)...")
-        for i in range(1, json_config + 1):
-            create_file(test_data_dir / 'config' / f'config_{i}.json',
-                       f"""{{
-  "name": "config_{i}",
-  "version": "1.0.{i}",
-  "settings": {{
+    return x * %(i)d;
+}
+
+export function processData%(i)d(data) {
+    return data.map(x => x + %(i)d);
+}"""
+
+JSON_CONFIG_TPL = b"""{
+  "name": "config_%(i)d",
+  "version": "1.0.%(i)d",
+  "settings": {
     "enabled": true,
-    "value": {i}
-  }}
-}}""")
-            count += 1
-
-    # 7. YAML config
-    if yaml_config > 0:
-        print(f"  Creating YAML config files ({yaml_config} files)...")
-        for i in range(1, yaml_config + 1):
-            create_file(test_data_dir / 'config' / f'settings_{i}.yaml',
-                       f"""name: settings_{i}
-version: 1.0.{i}
+    "value": %(i)d
+  }
+}"""
+
+YAML_CONFIG_TPL = b"""name: settings_%(i)d
+version: 1.0.%(i)d
 settings:
   enabled: true
-  value: {i}
-  description: 'Configuration file {i}'""")
-            count += 1
+  value: %(i)d
+  description: 'Configuration file %(i)d'"""
 
-    # 8. Documentation
-    if docs > 0:
-        print(f"  Creating documentation files ({docs} files)...")
-        for i in range(1, docs + 1):
-            create_file(test_data_dir / 'docs' / f'doc_{i}.md',
-                       f"""# Documentation {i}
+DOCS_TPL = b"""# Documentation %(i)d
 
 ## Overview
-This is documentation file number {i}.
+This is documentation file number %(i)d.
 
 ## TODO
 - Add more examples
@@ -197,157 +90,243 @@ This is documentation file number {i}.
 
 ## Examples
 ```python
-from module_{i} import Module{i}
-obj = Module{i}()
+from module_%(i)d import Module%(i)d
+obj = Module%(i)d()
 result = obj.process()
 ```
 
 ## Notes
-FIXME: This section needs review.""")
-            count += 1
-
-    # 9. Shell scripts
-    if scripts > 0:
-        print(f"  Creating shell scripts ({scripts} files)...")
-        for i in range(1, scripts + 1):
-            script_path = test_data_dir / 'scripts' / f'script_{i}.sh'
-            create_file(script_path,
-                       f"""#!/bin/bash
-# Script {i}
+FIXME: This section needs review."""
+
+SCRIPTS_TPL = b"""#!/bin/bash
+# Script %(i)d
 # TODO: Add error handling
 
-function main() {{
-    echo "Running script {i}"
+function main() {
+    echo "Running script %(i)d"
     # FIXME: Add validation
-    local value={i}
+    local value=%(i)d
     echo "Value: $value"
-}}
+}
 
-main "$@" """)
-            script_path.chmod(0o755)
-            count += 1
+main "$@" """
 
-    # 10. Python library
-    if py_lib > 0:
-        print(f"  Creating Python library files ({py_lib} files)...")
-        for i in range(1, py_lib + 1):
-            create_file(test_data_dir / 'lib' / f'library_{i}.py',
-                       f'''"""Library module {i}"""
+PYTHON_LIB_TPL = b'''"""Library module %(i)d"""
 
-class Library{i}:
+class Library%(i)d:
     """TODO: Add class documentation"""
 
     def __init__(self):
-        self.name = 'library_{i}'
+        self.name = 'library_%(i)d'
 
     def execute(self):
         # FIXME: Implement logic
-        pass''')
-            count += 1
-
-    # 11. JavaScript library
-    if js_lib > 0:
-        print(f"  Creating JavaScript library files ({js_lib} files)...")
-        for i in range(1, js_lib + 1):
-            create_file(test_data_dir / 'lib' / f'common_{i}.js',
-                       f"""/**
- * Common utilities {i}
+        pass'''
+
+JS_LIB_TPL = b"""/**
+ * Common utilities %(i)d
  * TODO: Add JSDoc comments
  */
 
-export const CONSTANT_{i} = {i};
+export const CONSTANT_%(i)d = %(i)d;
 
-export function commonFunction{i}() {{
+export function commonFunction%(i)d() {
     // FIXME: Add implementation
-    return CONSTANT_{i};
-}}""")
-            count += 1
-
-    # 12. Examples
-    if examples > 0:
-        print(f"  Creating example files ({examples} files)...")
-        for i in range(1, examples + 1):
-            create_file(test_data_dir / 'examples' / f'example_{i}.py',
-                       f'''#!/usr/bin/env python3
-"""Example {i}"""
+    return CONSTANT_%(i)d;
+}"""
+
+EXAMPLES_TPL = b'''#!/usr/bin/env python3
+"""Example %(i)d"""
 
 # TODO: Add more examples
 
-def example_{i}():
+def example_%(i)d():
     """
-    Example function {i}
+    Example function %(i)d
     FIXME: Add proper error handling
     """
-    value = {i}
+    value = %(i)d
     result = value * 2
-    print(f"Result: {{result}}")
+    print(f"Result: {result}")
     return result
 
 if __name__ == '__main__':
-    example_{i}()''')
-            count += 1
-
-    # 13. Text files
-    if txt_files > 0:
-        print(f"  Creating text data files ({txt_files} files)...")
-        for i in range(1, txt_files + 1):
-            create_file(test_data_dir / 'src' / f'data_{i}.txt',
-                       f"""Data file {i}
+    example_%(i)d()'''
+
+TEXT_TPL = b"""Data file %(i)d
 This is a text file with some content.
 TODO: Process this data
-Line {i}
-FIXME: Review content""")
-            count += 1
-
-    # 14. Env files
-    if env_files > 0:
-        print(f"  Creating environment files ({env_files} files)...")
-        for i in range(1, env_files + 1):
-            create_file(test_data_dir / 'config' / f'env_{i}.env',
-                       f"""# Environment {i}
-VAR_{i}=value_{i}
+Line %(i)d
+FIXME: Review content"""
+
+ENV_TPL = b"""# Environment %(i)d
+VAR_%(i)d=value_%(i)d
 DEBUG=true
-# TODO: Add more variables""")
-            count += 1
+# TODO: Add more variables"""
 
-    # 15. README files
-    if readme_files > 0:
-        print(f"  Creating README files ({readme_files} files)...")
-        for i in range(1, readme_files + 1):
-            create_file(test_data_dir / 'docs' / f'README_{i}.md',
-                       f"""# README {i}
+README_TPL = b"""# README %(i)d
 
-Project documentation {i}.
+Project documentation %(i)d.
 
 ## TODO
 - Complete documentation
-- Add examples""")
-            count += 1
-
-    # 16. Legacy files
-    if legacy_files > 0:
-        print(f"  Creating legacy Python files ({legacy_files} files)...")
-        for i in range(1, legacy_files + 1):
-            create_file(test_data_dir / 'src' / f'legacy_{i}.py',
-                       f"""# Legacy code {i}
+- Add examples"""
+
+LEGACY_TPL = b"""# Legacy code %(i)d
 # DEPRECATED: This module is deprecated
 # TODO: Remove in next version
 
-def old_function_{i}():
-    return {i}""")
-            count += 1
+def old_function_%(i)d():
+    return %(i)d"""
 
-    # 17. Integration tests
-    if integration_tests > 0:
-        print(f"  Creating integration test files ({integration_tests} files)...")
-        for i in range(1, integration_tests + 1):
-            create_file(test_data_dir / 'tests' / f'integration_test_{i}.py',
-                       f"""# Integration test {i}
+INTEGRATION_TESTS_TPL = b"""# Integration test %(i)d
 # TODO: Add more test cases
 
-def test_integration_{i}():
-    assert True  # FIXME: Real test needed""")
-            count += 1
+def test_integration_%(i)d():
+    assert True  # FIXME: Real test needed"""
+
+
+# (description, share of the total, directory, file name, template, mode);
+# the second-to-last share is of whatever is left after rounding the others
+# down, and the last row (share None) takes the rest
+CATEGORIES = [
+    ('Python source files', 0.15, 'src', b'module_%d.py', PYTHON_SRC_TPL, None),
+    ('Python helper files', 0.05, 'src', b'helper_%d.py', PYTHON_HELPERS_TPL, None),
+    ('test files', 0.15, 'tests', b'test_module_%d.py', TESTS_TPL, None),
+    ('JavaScript component files', 0.10, 'src', b'component_%d.js', JS_COMPONENTS_TPL, None),
+    ('JavaScript utility files', 0.05, 'src', b'util_%d.js', JS_UTILS_TPL, None),
+    ('JSON config files', 0.05, 'config', b'config_%d.json', JSON_CONFIG_TPL, None),
+    ('YAML config files', 0.05, 'config', b'settings_%d.yaml', YAML_CONFIG_TPL, None),
+    ('documentation files', 0.10, 'docs', b'doc_%d.md', DOCS_TPL, None),
+    ('shell scripts', 0.08, 'scripts', b'script_%d.sh', SCRIPTS_TPL, 0o755),
+    ('Python library files', 0.04, 'lib', b'library_%d.py', PYTHON_LIB_TPL, None),
+    ('JavaScript library files', 0.03, 'lib', b'common_%d.js', JS_LIB_TPL, None),
+    ('example files', 0.10, 'examples', b'example_%d.py', EXAMPLES_TPL, None),
+    ('text data files', 0.03, 'src', b'data_%d.txt', TEXT_TPL, None),
+    ('environment files', 0.01, 'config', b'env_%d.env', ENV_TPL, None),
+    ('README files', 0.01, 'docs', b'README_%d.md', README_TPL, None),
+    ('legacy Python files', 0.6, 'src', b'legacy_%d.py', LEGACY_TPL, None),
+    ('integration test files', None, 'tests', b'integration_test_%d.py', INTEGRATION_TESTS_TPL, None),
+]
+
+
+def create_file(filepath, content, mode=None, dir_fd=None):
+    """Create a file with the given bytes content using a single raw write"""
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=dir_fd)
+    try:
+        os.write(fd, content)
+        if mode is not None:
+            os.fchmod(fd, mode)
+    finally:
+        os.close(fd)
+
+
+def walk_counts(root):
+    """Count regular files under root, in total (b'*') and by extension, in one pass
+
+    The walk runs on bytes paths so names are never decoded; extensions are
+    found with bytes.rfind, which is a single memrchr call.
+    """
+    counts = Counter()
+    stack = [os.fsencode(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    counts[b'*'] += 1
+                    name = entry.name
+                    dot = name.rfind(b'.')
+                    if dot >= 0:
+                        counts[name[dot + 1:]] += 1
+    return counts
+
+
+def split_range(total, parts):
+    """Split the indices 1..total into at most `parts` contiguous (start, stop) ranges"""
+    size, extra = divmod(total, parts)
+    start = 1
+    for k in range(parts):
+        stop = start + size + (1 if k < extra else 0)
+        if stop > start:
+            yield start, stop
+        start = stop
+
+
+def emit_files(directory, name_template, content_template, mode, start, stop):
+    """Create the files of one category numbered start..stop-1 inside directory"""
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for i in range(start, stop):
+            create_file(name_template % i, content_template % {b'i': i}, mode=mode, dir_fd=dir_fd)
+    finally:
+        os.close(dir_fd)
+    return stop - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate benchmark test files')
+    parser.add_argument('-n', '--num-files', type=int, default=100000,
+                       help='Number of files to generate (default: 100000)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                       help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    file_count = args.num_files
+
+    if file_count < 100:
+        print(f"Error: File count must be >= 100")
+        sys.exit(1)
+
+    # Setup paths
+    script_dir = Path(__file__).parent
+    test_data_dir = script_dir / 'test_data'
+
+    print(f"🔧 Setting up benchmark test data...")
+    print(f"📊 Target file count: {file_count}")
+
+    # Clean and create directories
+    if test_data_dir.exists():
+        print("Removing existing test data...")
+        import shutil
+        shutil.rmtree(test_data_dir)
+
+    # Create the category directories with mkdirat() against one open
+    # directory descriptor rather than resolving a full path for each
+    test_data_dir.mkdir(parents=True, exist_ok=True)
+    dirs = dict.fromkeys(subdir for _, _, subdir, *_ in CATEGORIES)
+    root_fd = os.open(test_data_dir, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for dir_name in dirs:
+            os.mkdir(dir_name, 0o755, dir_fd=root_fd)
+    finally:
+        os.close(root_fd)
+
+    print(f"📁 Creating {file_count} test files...")
+
+    # Calculate file distribution
+    counts = [int(file_count * share) for _, share, *_ in CATEGORIES[:-2]]
+    remaining = file_count - sum(counts)
+    legacy_files = int(remaining * CATEGORIES[-2][1])
+    counts += [legacy_files, remaining - legacy_files]
+
+    # Each category is sharded into contiguous index ranges across worker
+    # processes; directories were created above so workers never race on mkdir,
+    # and each range opens its directory once and creates files relative to it
+    workers = max(1, args.jobs)
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for (label, _, subdir, name_template, content_template, mode), total in zip(CATEGORIES, counts):
+            if total > 0:
+                print(f"  Creating {label} ({total} files)...")
+                directory = str(test_data_dir / subdir)
+                for start, stop in split_range(total, workers):
+                    futures.append(pool.submit(emit_files, directory, name_template,
+                                               content_template, mode, start, stop))
+        for future in futures:
+            count += future.result()
 
     print()
     print("✅ Setup complete!")
@@ -355,10 +334,8 @@ def test_integration_{i}():
     print()
 
     # Verify file count
-    import subprocess
-    result = subprocess.run(['find', str(test_data_dir), '-type', 'f'],
-                          capture_output=True, text=True)
-    actual_count = len(result.stdout.strip().split('\n')) if result.stdout.strip() else 0
+    counts = walk_counts(test_data_dir)
+    actual_count = counts[b'*']
 
     if actual_count == file_count:
         print(f"✓ File count verification: {actual_count} files (matches target)")
@@ -369,14 +346,11 @@ def test_integration_{i}():
     print("File distribution:")
 
     # Count by extension
-    for ext, name in [('*.py', 'Python files'), ('*.js', 'JavaScript files'),
-                      ('*.json', 'JSON files'), ('*.yaml', 'YAML files'),
-                      ('*.md', 'Markdown files'), ('*.sh', 'Shell scripts'),
-                      ('*.txt', 'Text files'), ('*.env', 'Env files')]:
-        result = subprocess.run(['find', str(test_data_dir), '-type', 'f', '-name', ext],
-                              capture_output=True, text=True)
-        ext_count = len(result.stdout.strip().split('\n')) if result.stdout.strip() else 0
-        print(f"  {name:20s} {ext_count}")
+    for ext, name in [(b'py', 'Python files'), (b'js', 'JavaScript files'),
+                      (b'json', 'JSON files'), (b'yaml', 'YAML files'),
+                      (b'md', 'Markdown files'), (b'sh', 'Shell scripts'),
+                      (b'txt', 'Text files'), (b'env', 'Env files')]:
+        print(f"  {name:20s} {counts[ext]}")
 
     print()
     print("Ready to run benchmarks with: ./run_benchmark.sh")
@@ -2,21 +2,129 @@
 """MCP server for fast file search using fd (fdfind)."""
 
 import asyncio
+import functools
+import os
+import re
+import shlex
 import shutil
+import signal
 import subprocess
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
 from typing import Any
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
-# Detect fd binary name (fd on most systems, fdfind on Debian/Ubuntu)
-FD_CMD = shutil.which("fd") or shutil.which("fdfind")
-RG_CMD = shutil.which("rg")
-
 server = Server("fd-mcp")
 
 
+@dataclass(frozen=True)
+class Binaries:
+    """Absolute paths of the external tools, None when not installed."""
+
+    fd: str | None
+    rg: str | None
+
+
+@functools.cache
+def binaries() -> Binaries:
+    """Locate fd and rg on PATH, once, on first use rather than at import."""
+    # fd is installed as fdfind on Debian/Ubuntu
+    return Binaries(fd=shutil.which("fd") or shutil.which("fdfind"), rg=shutil.which("rg"))
+
+
+# build_fd_command switches and the fd flag each one enables
+_FD_FLAGS = (
+    ("hidden", "--hidden"),
+    ("no_ignore", "--no-ignore"),
+    ("case_sensitive", "--case-sensitive"),
+    ("absolute_path", "--absolute-path"),
+)
+
+# build_fd_command values and the fd option each one is passed to
+_FD_OPTIONS = (
+    ("file_type", "--type"),
+    ("extension", "--extension"),
+    ("max_depth", "--max-depth"),
+    ("exclude", "--exclude"),
+    ("changed_within", "--changed-within"),
+    ("max_results", "--max-results"),
+)
+
+# Options that only save work; they are left out for fd versions without them
+_FD_OPTIONAL = frozenset({"--max-results"})
+
+# Any of these makes a search pattern a regex rather than a plain literal
+_REGEX_META = re.compile(r"[.^$*+?()\[\]{}|\\]")
+
+# fd and rg size their thread pools from the host's CPU count, which
+# overshoots when the server is pinned to a subset of CPUs (e.g. in a
+# container); pass the CPUs this process may actually run on instead
+_NCPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 4
+_THREADS = str(_NCPUS)
+
+# fd_exec commands mostly wait on process start-up and I/O, so several run
+# per CPU; the bound is shared by all fd_exec calls the server is serving
+_EXEC_CONCURRENCY = min(32, _NCPUS * 4)
+_exec_limit: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+# Walks and searches this small finish before a thread pool pays off
+_SMALL_MAX_DEPTH = 2
+_SMALL_FILE_COUNT = 50
+
+# Results reused by tools that accept a slightly stale answer:
+# key -> (mtime_ns of the searched path, time stored, output)
+_RESULT_CACHE: OrderedDict[Hashable, tuple[int, float, str]] = OrderedDict()
+_RESULT_CACHE_SIZE = 128
+_RESULT_CACHE_TTL = 60.0
+
+
+_fd_features: frozenset[str] | None = None
+
+
+def fd_features() -> frozenset[str]:
+    """Return the long options the installed fd supports, probed from --help.
+
+    main() probes before the event loop starts. A successful probe is kept
+    for the life of the process; a failed one is retried on the next call.
+    """
+    global _fd_features
+    if _fd_features is None:
+        try:
+            result = subprocess.run([binaries().fd, "--help"], capture_output=True, text=True, timeout=5)
+        except Exception:
+            return frozenset()
+        if result.returncode != 0:
+            return frozenset()
+        _fd_features = frozenset(re.findall(r"--[a-z][a-z0-9-]*", result.stdout))
+        # argvs built while the probe was failing lack the optional options
+        build_fd_command.cache_clear()
+    return _fd_features
+
+
+@functools.lru_cache(maxsize=1024)
+def _is_literal(pattern: str) -> bool:
+    """Return True if pattern has no regex syntax and can be matched as a plain string."""
+    return not _REGEX_META.search(pattern)
+
+
+@functools.lru_cache(maxsize=256)
+def _extension_glob(extension: str) -> str | None:
+    """Return an rg glob matching extension case-insensitively, like fd's --extension.
+
+    Returns None if the extension contains glob syntax; such searches are
+    left to fd.
+    """
+    if re.search(r"[*?\[\]{}\\:,!/]", extension):
+        return None
+    return "*." + "".join(f"[{c.lower()}{c.upper()}]" if c.lower() != c.upper() else c for c in extension)
+
+
+@functools.lru_cache(maxsize=256)
 def build_fd_command(
     pattern: str = "",
     path: str = ".",
@@ -28,66 +136,225 @@ def build_fd_command(
     exclude: str | None = None,
     case_sensitive: bool = False,
     absolute_path: bool = False,
-) -> list[str]:
-    """Build fd command with arguments."""
-    if not FD_CMD:
-        raise RuntimeError("fd/fdfind not found in PATH")
-
-    cmd = [FD_CMD]
-
-    if hidden:
-        cmd.append("--hidden")
-    if no_ignore:
-        cmd.append("--no-ignore")
-    if case_sensitive:
-        cmd.append("--case-sensitive")
-    if absolute_path:
-        cmd.append("--absolute-path")
-    if file_type:
-        cmd.extend(["--type", file_type])
-    if extension:
-        cmd.extend(["--extension", extension])
-    if max_depth is not None:
-        cmd.extend(["--max-depth", str(max_depth)])
-    if exclude:
-        cmd.extend(["--exclude", exclude])
+    changed_within: str | None = None,
+    max_results: int | None = None,
+) -> tuple[str, ...]:
+    """Build fd command with arguments.
+
+    Results are cached, so the returned argv is an immutable tuple. main()
+    has already checked that fd is installed. Paths are NUL-terminated
+    (--print0) so names containing newlines survive parsing.
+    """
+    args = locals()
+    features = fd_features()
+    threads = "1" if max_depth is not None and max_depth <= _SMALL_MAX_DEPTH else _THREADS
+    cmd = [binaries().fd, "--print0", "--threads", threads, *(flag for name, flag in _FD_FLAGS if args[name])]
+    for name, option in _FD_OPTIONS:
+        value = args[name]
+        if value in (None, "") or (option in _FD_OPTIONAL and option not in features):
+            continue
+        cmd += (option, str(value))
 
     if pattern:
         cmd.append(pattern)
     cmd.append(path)
 
-    return cmd
+    return tuple(cmd)
+
 
+async def _read_records(stream: asyncio.StreamReader, limit: int, sep: bytes) -> tuple[bytearray, int]:
+    """Read up to limit sep-terminated records from a subprocess stream.
 
-def run_fd(cmd: list[str], max_results: int = 100) -> str:
-    """Execute fd command and return output."""
+    The stream is read in large chunks and the records are returned as one
+    buffer together with their count, so no per-record objects are created.
+    fd's paths are NUL-terminated (--print0); rg's per-file blocks are
+    separated by a blank line (b"\n\n").
+    """
+    data = bytearray()
+    count = end = 0
+    while count < limit:
+        chunk = await stream.read(1 << 16)
+        if not chunk:
+            if end < len(data):
+                # last record without a trailing separator
+                count += 1
+                end = len(data)
+            break
+        data += chunk
+        while count < limit:
+            pos = data.find(sep, end)
+            if pos < 0:
+                break
+            end = pos + len(sep)
+            count += 1
+    del data[end:]
+    return data, count
+
+
+def _find_nth(data: bytes, sep: bytes, n: int) -> int:
+    """Return the index of the nth occurrence of sep in data, or -1."""
+    pos = -len(sep)
+    for _ in range(n):
+        pos = data.find(sep, pos + len(sep))
+        if pos < 0:
+            break
+    return pos
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    """Kill a subprocess that may already have exited."""
+    if proc.returncode is not None:
+        return
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
+        if hasattr(signal, "SIGKILL"):
+            # Not proc.kill(): Popen polls the child first and can reap one
+            # that just exited behind asyncio's back, losing its exit status
+            os.kill(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def run_fd(cmd: tuple[str, ...], max_results: int = 100, capture_warnings: bool = False) -> str:
+    """Execute fd command and return output.
+
+    The command should be built with max_results + 1 so fd stops walking as
+    soon as truncation is certain and run_fd can still detect it. stderr is
+    only captured when capture_warnings is set.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE if capture_warnings else asyncio.subprocess.DEVNULL,
         )
-        lines = result.stdout.strip().split("\n") if result.stdout.strip() else []
+        try:
+            data, count = await asyncio.wait_for(_read_records(proc.stdout, max_results + 1, sep=b"\0"), timeout=30)
+            if count > max_results:
+                _kill(proc)
+                del data[_find_nth(data, b"\0", max_results) + 1:]
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout=30)
+        except asyncio.TimeoutError:
+            _kill(proc)
+            await proc.wait()
+            return "Error: Command timed out after 30 seconds"
 
-        if len(lines) > max_results:
-            output = "\n".join(lines[:max_results])
-            output += f"\n\n... and {len(lines) - max_results} more results (truncated)"
-        else:
-            output = "\n".join(lines)
+        output = data.replace(b"\0", b"\n").decode("utf-8", "replace").rstrip("\n")
+        if count > max_results:
+            output += f"\n\n... more results available (truncated at {max_results})"
+
+        if stderr:
+            output += f"\n\nWarnings: {stderr.decode('utf-8', 'replace')}"
 
-        if result.stderr:
-            output += f"\n\nWarnings: {result.stderr}"
+        # fd failed without output (e.g. an invalid regex): run it again with
+        # stderr captured so the caller sees the reason
+        if not output and proc.returncode and not capture_warnings:
+            return await run_fd(cmd, max_results, capture_warnings=True)
 
         return output if output else "No matches found."
 
-    except subprocess.TimeoutExpired:
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def _exec_semaphore() -> asyncio.Semaphore:
+    """Return the server-wide semaphore bounding running fd_exec commands.
+
+    It is created on first use inside the running event loop, and again if
+    a new loop is started.
+    """
+    global _exec_limit
+    loop = asyncio.get_running_loop()
+    if _exec_limit is None or _exec_limit[0] is not loop:
+        _exec_limit = (loop, asyncio.Semaphore(_EXEC_CONCURRENCY))
+    return _exec_limit[1]
+
+
+async def _cached_result(key: Hashable, path: str, run: Callable[[], Awaitable[str]]) -> str:
+    """Return run()'s output, reusing a result for key from the last minute.
+
+    A cached result is dropped once the mtime of path changes. Only path
+    itself is checked, so changes deeper in the tree go unnoticed until the
+    entry expires; callers opt in with stale_ok.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return await run()
+
+    now = time.monotonic()
+    entry = _RESULT_CACHE.get(key)
+    if entry and entry[0] == mtime and now - entry[1] < _RESULT_CACHE_TTL:
+        _RESULT_CACHE.move_to_end(key)
+        return entry[2]
+
+    output = await run()
+    if not output.startswith("Error"):
+        _RESULT_CACHE[key] = (mtime, now, output)
+        _RESULT_CACHE.move_to_end(key)
+        if len(_RESULT_CACHE) > _RESULT_CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+    return output
+
+
+async def _communicate(proc: asyncio.subprocess.Process, timeout: float = 30) -> tuple[bytes, bytes]:
+    """Wait for a subprocess and return its output, killing it on timeout."""
+    try:
+        return await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        _kill(proc)
+        await proc.wait()
+        raise
+
+
+async def _list_fd_paths(cmd: tuple[str, ...], limit: int) -> list[str]:
+    """Run fd and return at most limit paths, stopping fd once it has produced them."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        data, count = await asyncio.wait_for(_read_records(proc.stdout, limit, sep=b"\0"), timeout=30)
+    except asyncio.TimeoutError:
+        _kill(proc)
+        await proc.wait()
+        raise
+    if count == limit:
+        _kill(proc)
+    await proc.wait()
+    return os.fsdecode(bytes(data)).split("\0")[:count]
+
+
+async def count_fd(cmd: tuple[str, ...], stale_ok: bool = False) -> str:
+    """Execute fd command and return the number of matches.
+
+    With stale_ok set a count from the last minute may be reused.
+    """
+    if stale_ok:
+        # build_fd_command puts the search path last
+        return await _cached_result(cmd, cmd[-1], lambda: count_fd(cmd))
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await _communicate(proc)
+
+        # Count path terminators in the raw bytes; paths are never decoded or split
+        count = stdout.count(b"\0")
+        return f"Found {count} matches"
+
+    except asyncio.TimeoutError:
         return "Error: Command timed out after 30 seconds"
     except Exception as e:
         return f"Error: {e}"
 
 
-def run_fd_with_content_search(
+async def run_fd_with_content_search(
     search_pattern: str,
     file_pattern: str = "",
     path: str = ".",
@@ -98,75 +365,130 @@ def run_fd_with_content_search(
     case_sensitive: bool = False,
     context_lines: int = 0,
     max_results: int = 100,
+    max_columns: int = 150,
+    max_filesize: str = "50M",
 ) -> str:
-    """Search for content within files found by fd using ripgrep."""
-    if not RG_CMD:
-        return "Error: ripgrep (rg) not found. Please install ripgrep for content search."
+    """Search for content within files found by fd using ripgrep.
 
-    # Build fd command to find files
-    fd_cmd = [FD_CMD]
-    if hidden:
-        fd_cmd.append("--hidden")
-    if no_ignore:
-        fd_cmd.append("--no-ignore")
-    if file_type:
-        fd_cmd.extend(["--type", file_type])
-    if extension:
-        fd_cmd.extend(["--extension", extension])
-    if file_pattern:
-        fd_cmd.append(file_pattern)
-    fd_cmd.append(path)
+    Lines longer than max_columns are cut to a preview and files larger than
+    max_filesize are skipped, so one minified bundle or huge log cannot use
+    up the whole time limit.
+    """
+    rg = binaries().rg
+    if not rg:
+        return "Error: ripgrep (rg) not found. Please install ripgrep for content search."
 
     # Build ripgrep command
-    rg_cmd = [RG_CMD]
+    rg_cmd = [rg]
     if not case_sensitive:
         rg_cmd.append("--ignore-case")
     if context_lines > 0:
         rg_cmd.extend(["--context", str(context_lines)])
     rg_cmd.extend(["--line-number", "--heading", "--color=never"])
-    rg_cmd.append(search_pattern)
+    if max_columns > 0:
+        rg_cmd.extend([f"--max-columns={max_columns}", "--max-columns-preview"])
+    if max_filesize:
+        rg_cmd.extend(["--max-filesize", max_filesize])
+    # Patterns without regex syntax take rg's literal substring search
+    if _is_literal(search_pattern):
+        rg_cmd.append("--fixed-strings")
 
-    try:
-        # Get file list from fd
-        fd_result = subprocess.run(
-            fd_cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
+    ext_glob = _extension_glob(extension) if extension else None
 
-        if not fd_result.stdout.strip():
-            return "No files found matching the file pattern."
+    try:
+        if not file_pattern and file_type in (None, "f") and (ext_glob or not extension):
+            # rg can select these files itself, which saves the fd process
+            # and lets it overlap walking with searching
+            if hidden:
+                rg_cmd.append("--hidden")
+            if no_ignore:
+                rg_cmd.append("--no-ignore")
+            if ext_glob:
+                # A type filter, unlike --glob, still honours ignore files;
+                # files matching it bypass the hidden check, so hidden files
+                # are excluded explicitly
+                rg_cmd.extend(["--type-add", f"fdext:{ext_glob}", "--type", "fdext"])
+                if not hidden:
+                    rg_cmd.extend(["--glob", "!.*"])
+            rg_cmd.extend(["--threads", _THREADS, search_pattern, path])
+            files = None
+        else:
+            # Get file list from fd, reading only as many paths as will be
+            # searched; fd stops one file past the limit
+            fd_cmd = build_fd_command(
+                pattern=file_pattern,
+                path=path,
+                file_type=file_type,
+                extension=extension,
+                hidden=hidden,
+                no_ignore=no_ignore,
+                max_results=max_results + 1,
+            )
+            files = await _list_fd_paths(fd_cmd, max_results + 1)
 
-        files = fd_result.stdout.strip().split("\n")
+            if not files:
+                return "No files found matching the file pattern."
 
-        # Search content with ripgrep in found files
-        rg_cmd.extend(files[:max_results])
+            # Search content with ripgrep in found files
+            threads = "1" if len(files) <= _SMALL_FILE_COUNT else _THREADS
+            rg_cmd.extend(["--threads", threads, search_pattern])
+            rg_cmd.extend(files[:max_results])
 
-        rg_result = subprocess.run(
-            rg_cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
+        rg_proc = await asyncio.create_subprocess_exec(
+            *rg_cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
+        if files is None:
+            # rg walks the whole tree here, so stream its output and stop it
+            # once one more file has matched than will be shown; --heading
+            # separates each file's matches with a blank line. stderr is
+            # drained alongside so warnings cannot fill its pipe and stall rg
+            stderr_read = asyncio.ensure_future(rg_proc.stderr.read())
+            try:
+                rg_stdout, count = await asyncio.wait_for(
+                    _read_records(rg_proc.stdout, max_results + 1, sep=b"\n\n"), timeout=30
+                )
+            except asyncio.TimeoutError:
+                _kill(rg_proc)
+                stderr_read.cancel()
+                await rg_proc.wait()
+                raise
+            truncated = count > max_results
+            if truncated:
+                _kill(rg_proc)
+                del rg_stdout[_find_nth(rg_stdout, b"\n\n", max_results):]
+            rg_stderr = await stderr_read
+            await rg_proc.wait()
+        else:
+            rg_stdout, rg_stderr = await _communicate(rg_proc)
+            truncated = len(files) > max_results
 
-        if rg_result.returncode == 0:
-            output = rg_result.stdout.strip()
-            if len(files) > max_results:
-                output += f"\n\n... searched {max_results} of {len(files)} files (truncated)"
-            return output if output else "No content matches found."
-        elif rg_result.returncode == 1:
+        if rg_proc.returncode == 1:
             return "No content matches found in the files."
-        else:
-            return f"Error: {rg_result.stderr}"
+        # rg exits with 2 after any error, e.g. an unreadable directory, even
+        # when it found matches; those are kept and the errors shown as warnings
+        if rg_proc.returncode != 0 and not rg_stdout:
+            return f"Error: {rg_stderr.decode('utf-8', 'replace')}"
 
-    except subprocess.TimeoutExpired:
+        output = rg_stdout.decode("utf-8", "replace").strip()
+        if truncated and files is None:
+            output += "\n\n... matches in more files (truncated)"
+        elif truncated:
+            output += f"\n\n... searched the first {max_results} files (truncated)"
+
+        if rg_proc.returncode != 0 and rg_stderr:
+            output += f"\n\nWarnings: {rg_stderr.decode('utf-8', 'replace')}"
+
+        return output if output else "No content matches found."
+
+    except asyncio.TimeoutError:
         return "Error: Command timed out after 30 seconds"
     except Exception as e:
         return f"Error: {e}"
 
 
-def run_fd_exec(
+async def run_fd_exec(
     command: str,
     pattern: str = "",
     path: str = ".",
@@ -175,8 +497,15 @@ def run_fd_exec(
     hidden: bool = False,
     no_ignore: bool = False,
     max_files: int = 100,
+    batch: bool = False,
 ) -> str:
-    """Execute a command on files found by fd (replacement for find -exec)."""
+    """Execute a command on files found by fd (replacement for find -exec).
+
+    The command is split into arguments once and run without a shell; {}
+    is replaced by the file, which is appended if there is no {}. With
+    batch set the command runs once with every file in place of {} (like
+    fd --exec-batch).
+    """
     # Build fd command
     fd_cmd = build_fd_command(
         pattern=pattern,
@@ -185,49 +514,139 @@ def run_fd_exec(
         extension=extension,
         hidden=hidden,
         no_ignore=no_ignore,
+        max_results=max_files,
     )
 
+    # Bound how many commands run at once, across concurrent calls
+    limit = _exec_semaphore()
+
+    async def run_one(file: str) -> tuple[str, bytes, bytes]:
+        if has_slot:
+            file_argv = [token.replace("{}", file) if "{}" in token else token for token in argv]
+        else:
+            file_argv = [*argv, file]
+        async with limit:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *file_argv,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except OSError as e:
+                # e.g. a missing or non-executable program; report it for
+                # this file like the command's own errors
+                return file, b"", str(e).encode()
+            try:
+                stdout, stderr = await _communicate(proc, timeout=10)
+            except asyncio.TimeoutError:
+                return file, b"", b"Error: Command timed out after 10 seconds"
+        return file, stdout, stderr
+
     try:
-        # Get file list
-        fd_result = subprocess.run(
-            fd_cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
+        argv = shlex.split(command)
+        if not argv:
+            return "Error: Empty command"
+        has_slot = any("{}" in token for token in argv)
+        if batch and any("{}" in token and token != "{}" for token in argv):
+            return "Error: In batch mode {} must be a separate argument (e.g. 'wc -l {}'), not part of one"
 
-        if not fd_result.stdout.strip():
+        # Get file list; fd is stopped as soon as max_files paths are read
+        files = await _list_fd_paths(fd_cmd, max_files)
+        if not files:
             return "No files found."
 
-        files = fd_result.stdout.strip().split("\n")[:max_files]
-
-        # Execute command on each file
-        results = []
-        for file in files:
-            cmd = command.replace("{}", file)
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            if result.stdout or result.stderr:
-                results.append(f"{file}:\n{result.stdout}{result.stderr}")
+        if batch:
+            return await _run_batch(argv, files, max_files)
+
+        # Execute command on all files concurrently; gather keeps fd's order.
+        # Output stays bytes and is decoded once at the end
+        buf = bytearray()
+        for file, stdout, stderr in await asyncio.gather(*(run_one(f) for f in files)):
+            if stdout or stderr:
+                if buf:
+                    buf += b"\n\n"
+                buf += os.fsencode(file)
+                buf += b":\n"
+                buf += stdout
+                buf += stderr
 
-        if results:
-            output = "\n\n".join(results)
+        if buf:
+            output = buf.decode("utf-8", "replace")
             if len(files) == max_files:
                 output += f"\n\n... processed {max_files} files (limit reached)"
             return output
         else:
             return f"Command executed on {len(files)} files (no output)"
 
+    except asyncio.TimeoutError:
+        return "Error: Command timed out after 30 seconds"
     except Exception as e:
         return f"Error: {e}"
 
 
-def find_recent_files(
+def _arg_budget() -> int:
+    """Return how many bytes of arguments a single command line may take."""
+    try:
+        arg_max = os.sysconf("SC_ARG_MAX")
+    except (AttributeError, ValueError, OSError):
+        # Windows limits the whole command line to 32767 characters
+        return 32000
+    # The environment shares the limit; leave some headroom as xargs does
+    env_size = sum(len(key) + len(value) + 2 + 8 for key, value in os.environ.items())
+    return max(4096, arg_max - env_size - 4096)
+
+
+def _chunk_files(files: list[str], budget: int) -> list[list[str]]:
+    """Split files into runs whose argv bytes, pointers included, fit in budget."""
+    chunks: list[list[str]] = []
+    chunk: list[str] = []
+    size = 0
+    for file in files:
+        cost = len(os.fsencode(file)) + 1 + 8
+        if chunk and size + cost > budget:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(file)
+        size += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def _run_batch(argv: list[str], files: list[str], max_files: int) -> str:
+    """Run argv with all files substituted for a {} argument (or appended).
+
+    Like fd --exec-batch and xargs, the files are split over several runs
+    when they would not fit on one command line.
+    """
+    budget = _arg_budget() - sum(len(os.fsencode(token)) + 1 + 8 for token in argv)
+
+    buf = bytearray()
+    for chunk in _chunk_files(files, budget):
+        if "{}" in argv:
+            run_argv = [arg for token in argv for arg in (chunk if token == "{}" else [token])]
+        else:
+            run_argv = [*argv, *chunk]
+
+        async with _exec_semaphore():
+            proc = await asyncio.create_subprocess_exec(
+                *run_argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await _communicate(proc)
+        buf += stdout
+        buf += stderr
+
+    output = buf.decode("utf-8", "replace").rstrip("\n")
+    if not output:
+        return f"Command executed on {len(files)} files (no output)"
+    if len(files) == max_files:
+        output += f"\n\n... processed {max_files} files (limit reached)"
+    return output
+
+
+async def find_recent_files(
     path: str = ".",
     hours: int = 24,
     file_type: str | None = None,
@@ -235,286 +654,313 @@ def find_recent_files(
     max_results: int = 50,
 ) -> str:
     """Find recently modified files using fd."""
-    # Build fd command with change-newer-than
-    cmd = [FD_CMD, "--changed-within", f"{hours}h"]
-
-    if file_type:
-        cmd.extend(["--type", file_type])
-    if extension:
-        cmd.extend(["--extension", extension])
-
-    cmd.append(path)
+    cmd = build_fd_command(
+        path=path,
+        file_type=file_type,
+        extension=extension,
+        changed_within=f"{hours}h",
+        max_results=max_results + 1,
+    )
 
-    return run_fd(cmd, max_results)
+    return await run_fd(cmd, max_results)
 
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available fd tools."""
-    tools = [
-        Tool(
-            name="fd_search",
-            description="⚡ FAST FILE SEARCH: 5-10x faster than 'find' - Use this for ALL file/directory searches. "
-            "Parallel execution with smart defaults (.gitignore respected automatically). "
-            "WHEN TO USE: Anytime you think 'find' or need to locate files by name/pattern/type. "
-            "Quick examples: Python files? → pattern='.*', path='.', extension='py' | Test files? → pattern='test_.*', path='.' | Directories? → pattern='.*', path='.', type='d'. "
-            "Replaces: find, locate commands. This is your go-to tool for file discovery.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "pattern": {
-                        "type": "string",
-                        "description": "Search pattern (regex). Use '.*' or '' to match all files.",
-                    },
-                    "path": {
-                        "type": "string",
-                        "description": "Directory to search in (e.g., '.', 'src/', '/home/user/project').",
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["f", "d", "l", "x", "e", "s", "p"],
-                        "description": "Filter by type: f=file, d=directory, l=symlink, x=executable, e=empty, s=socket, p=pipe",
-                    },
-                    "extension": {
-                        "type": "string",
-                        "description": "Filter by file extension (e.g., 'py', 'js', 'txt')",
-                    },
-                    "hidden": {
-                        "type": "boolean",
-                        "description": "Include hidden files and directories",
-                        "default": False,
-                    },
-                    "no_ignore": {
-                        "type": "boolean",
-                        "description": "Don't respect .gitignore and other ignore files",
-                        "default": False,
-                    },
-                    "max_depth": {
-                        "type": "integer",
-                        "description": "Maximum search depth",
-                    },
-                    "exclude": {
-                        "type": "string",
-                        "description": "Exclude entries matching this glob pattern",
-                    },
-                    "case_sensitive": {
-                        "type": "boolean",
-                        "description": "Use case-sensitive search",
-                        "default": False,
-                    },
-                    "absolute_path": {
-                        "type": "boolean",
-                        "description": "Return absolute paths instead of relative",
-                        "default": False,
-                    },
-                    "max_results": {
-                        "type": "integer",
-                        "description": "Maximum number of results to return",
-                        "default": 100,
-                    },
-                },
-                "required": ["pattern", "path"],
+# Tool definitions are fixed, so they are built once at import
+_TOOLS = [
+    Tool(
+        name="fd_search",
+        description="⚡ FAST FILE SEARCH: 5-10x faster than 'find' - Use this for ALL file/directory searches. "
+        "Parallel execution with smart defaults (.gitignore respected automatically). "
+        "WHEN TO USE: Anytime you think 'find' or need to locate files by name/pattern/type. "
+        "Quick examples: Python files? → pattern='.*', path='.', extension='py' | Test files? → pattern='test_.*', path='.' | Directories? → pattern='.*', path='.', type='d'. "
+        "Replaces: find, locate commands. This is your go-to tool for file discovery.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "pattern": {
+                    "type": "string",
+                    "description": "Search pattern (regex). Use '.*' or '' to match all files.",
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory to search in (e.g., '.', 'src/', '/home/user/project').",
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["f", "d", "l", "x", "e", "s", "p"],
+                    "description": "Filter by type: f=file, d=directory, l=symlink, x=executable, e=empty, s=socket, p=pipe",
+                },
+                "extension": {
+                    "type": "string",
+                    "description": "Filter by file extension (e.g., 'py', 'js', 'txt')",
+                },
+                "hidden": {
+                    "type": "boolean",
+                    "description": "Include hidden files and directories",
+                    "default": False,
+                },
+                "no_ignore": {
+                    "type": "boolean",
+                    "description": "Don't respect .gitignore and other ignore files",
+                    "default": False,
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Maximum search depth",
+                },
+                "exclude": {
+                    "type": "string",
+                    "description": "Exclude entries matching this glob pattern",
+                },
+                "case_sensitive": {
+                    "type": "boolean",
+                    "description": "Use case-sensitive search",
+                    "default": False,
+                },
+                "absolute_path": {
+                    "type": "boolean",
+                    "description": "Return absolute paths instead of relative",
+                    "default": False,
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return",
+                    "default": 100,
+                },
             },
-        ),
-        Tool(
-            name="fd_search_content",
-            description="🔍 BLAZING CONTENT SEARCH: Lightning-fast code search using fd+ripgrep (10-100x faster than find -exec grep). "
-            "WHEN TO USE: Searching for text/code patterns across multiple files. This is THE tool for 'grep in files'. "
-            "One-shot operation: filters files AND searches content simultaneously. "
-            "Example: Find 'TODO' in Python → search_pattern='TODO', extension='py' | Find imports → search_pattern='import.*React'. "
-            "Replaces: find -exec grep, find | xargs grep, recursive grep. Always prefer this over bash grep commands.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "search_pattern": {
-                        "type": "string",
-                        "description": "Text or regex pattern to search for in file contents (required)",
-                    },
-                    "file_pattern": {
-                        "type": "string",
-                        "description": "Limit to files matching this name pattern (e.g., 'test_*', '*.config.*')",
-                        "default": "",
-                    },
-                    "path": {
-                        "type": "string",
-                        "description": "Directory to search in",
-                        "default": ".",
-                    },
-                    "extension": {
-                        "type": "string",
-                        "description": "Filter by file extension (e.g., 'py', 'js', 'rs')",
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["f", "d", "l", "x"],
-                        "description": "Filter by type: f=file (default), d=directory, l=symlink, x=executable",
-                    },
-                    "hidden": {
-                        "type": "boolean",
-                        "description": "Include hidden files",
-                        "default": False,
-                    },
-                    "no_ignore": {
-                        "type": "boolean",
-                        "description": "Don't respect .gitignore files",
-                        "default": False,
-                    },
-                    "case_sensitive": {
-                        "type": "boolean",
-                        "description": "Use case-sensitive search",
-                        "default": False,
-                    },
-                    "context_lines": {
-                        "type": "integer",
-                        "description": "Number of context lines to show around matches",
-                        "default": 0,
-                    },
-                    "max_results": {
-                        "type": "integer",
-                        "description": "Maximum number of files to search",
-                        "default": 100,
-                    },
-                },
-                "required": ["search_pattern"],
+            "required": ["pattern", "path"],
+        },
+    ),
+    Tool(
+        name="fd_search_content",
+        description="🔍 BLAZING CONTENT SEARCH: Lightning-fast code search using fd+ripgrep (10-100x faster than find -exec grep). "
+        "WHEN TO USE: Searching for text/code patterns across multiple files. This is THE tool for 'grep in files'. "
+        "One-shot operation: filters files AND searches content simultaneously. "
+        "Example: Find 'TODO' in Python → search_pattern='TODO', extension='py' | Find imports → search_pattern='import.*React'. "
+        "Replaces: find -exec grep, find | xargs grep, recursive grep. Always prefer this over bash grep commands.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "search_pattern": {
+                    "type": "string",
+                    "description": "Text or regex pattern to search for in file contents (required)",
+                },
+                "file_pattern": {
+                    "type": "string",
+                    "description": "Limit to files matching this name pattern (e.g., 'test_*', '*.config.*')",
+                    "default": "",
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory to search in",
+                    "default": ".",
+                },
+                "extension": {
+                    "type": "string",
+                    "description": "Filter by file extension (e.g., 'py', 'js', 'rs')",
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["f", "d", "l", "x"],
+                    "description": "Filter by type: f=file (default), d=directory, l=symlink, x=executable",
+                },
+                "hidden": {
+                    "type": "boolean",
+                    "description": "Include hidden files",
+                    "default": False,
+                },
+                "no_ignore": {
+                    "type": "boolean",
+                    "description": "Don't respect .gitignore files",
+                    "default": False,
+                },
+                "case_sensitive": {
+                    "type": "boolean",
+                    "description": "Use case-sensitive search",
+                    "default": False,
+                },
+                "context_lines": {
+                    "type": "integer",
+                    "description": "Number of context lines to show around matches",
+                    "default": 0,
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of files to search or report matches from",
+                    "default": 100,
+                },
+                "max_columns": {
+                    "type": "integer",
+                    "description": "Show only a preview of lines longer than this many bytes (0 = no limit)",
+                    "default": 150,
+                },
+                "max_filesize": {
+                    "type": "string",
+                    "description": "Skip files larger than this, e.g. '50M', '1G' (empty = no limit)",
+                    "default": "50M",
+                },
             },
-        ),
-        Tool(
-            name="fd_exec",
-            description="⚙️ FAST BULK OPERATIONS: Execute commands on multiple files (faster & safer than find -exec). "
-            "WHEN TO USE: Need to run a command on many files matching a pattern (format, count, process, etc.). "
-            "Use {} as filename placeholder. Built-in safety limits prevent runaway operations. "
-            "Examples: Count lines in Python files → command='wc -l {}', extension='py' | Format JS → command='prettier {}', extension='js'. "
-            "Replaces: find -exec, find | xargs. Modern replacement for batch file operations.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "command": {
-                        "type": "string",
-                        "description": "Command to execute on each file. Use {} as placeholder for filename (required)",
-                    },
-                    "pattern": {
-                        "type": "string",
-                        "description": "Search pattern to filter files (regex)",
-                        "default": "",
-                    },
-                    "path": {
-                        "type": "string",
-                        "description": "Directory to search in",
-                        "default": ".",
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["f", "d", "l", "x"],
-                        "description": "Filter by type: f=file, d=directory, l=symlink, x=executable",
-                    },
-                    "extension": {
-                        "type": "string",
-                        "description": "Filter by file extension",
-                    },
-                    "hidden": {
-                        "type": "boolean",
-                        "description": "Include hidden files",
-                        "default": False,
-                    },
-                    "no_ignore": {
-                        "type": "boolean",
-                        "description": "Don't respect .gitignore",
-                        "default": False,
-                    },
-                    "max_files": {
-                        "type": "integer",
-                        "description": "Maximum number of files to process",
-                        "default": 100,
-                    },
-                },
-                "required": ["command"],
+            "required": ["search_pattern"],
+        },
+    ),
+    Tool(
+        name="fd_exec",
+        description="⚙️ FAST BULK OPERATIONS: Execute commands on multiple files (faster & safer than find -exec). "
+        "WHEN TO USE: Need to run a command on many files matching a pattern (format, count, process, etc.). "
+        "Use {} as filename placeholder; the command runs directly, not through a shell (no pipes or redirects). "
+        "Built-in safety limits prevent runaway operations. "
+        "Examples: Count lines in Python files → command='wc -l {}', extension='py' | Format JS → command='prettier {}', extension='js'. "
+        "Replaces: find -exec, find | xargs. Modern replacement for batch file operations.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "command": {
+                    "type": "string",
+                    "description": "Command to execute on each file, run without a shell. "
+                    "Use {} as placeholder for filename; without {} the filename is appended (required)",
+                },
+                "pattern": {
+                    "type": "string",
+                    "description": "Search pattern to filter files (regex)",
+                    "default": "",
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory to search in",
+                    "default": ".",
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["f", "d", "l", "x"],
+                    "description": "Filter by type: f=file, d=directory, l=symlink, x=executable",
+                },
+                "extension": {
+                    "type": "string",
+                    "description": "Filter by file extension",
+                },
+                "hidden": {
+                    "type": "boolean",
+                    "description": "Include hidden files",
+                    "default": False,
+                },
+                "no_ignore": {
+                    "type": "boolean",
+                    "description": "Don't respect .gitignore",
+                    "default": False,
+                },
+                "max_files": {
+                    "type": "integer",
+                    "description": "Maximum number of files to process",
+                    "default": 100,
+                },
+                "batch": {
+                    "type": "boolean",
+                    "description": "Run the command once with all files in place of {} (like xargs). "
+                    "{} must be a separate argument; files are appended if it is missing. Very long file "
+                    "lists are split over several runs. Much faster for commands that accept many files, e.g. 'wc -l {}'",
+                    "default": False,
+                },
             },
-        ),
-        Tool(
-            name="fd_recent_files",
-            description="🕐 RECENT CHANGES FINDER: Instantly find recently modified files (faster than find -mtime). "
-            "WHEN TO USE: Investigating recent changes, debugging 'what changed?', reviewing work, finding active files. "
-            "Time-based filtering with simple hour parameter. "
-            "Examples: Last 2 hours → hours=2 | Today's work → hours=24 | Recent Python changes → hours=24, extension='py'. "
-            "Replaces: find -mtime, find -newermt. Essential for tracking codebase activity.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {
-                        "type": "string",
-                        "description": "Directory to search in",
-                        "default": ".",
-                    },
-                    "hours": {
-                        "type": "integer",
-                        "description": "Find files modified within this many hours",
-                        "default": 24,
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["f", "d", "l", "x"],
-                        "description": "Filter by type: f=file, d=directory, l=symlink, x=executable",
-                    },
-                    "extension": {
-                        "type": "string",
-                        "description": "Filter by file extension",
-                    },
-                    "max_results": {
-                        "type": "integer",
-                        "description": "Maximum number of results",
-                        "default": 50,
-                    },
-                },
-                "required": [],
+            "required": ["command"],
+        },
+    ),
+    Tool(
+        name="fd_recent_files",
+        description="🕐 RECENT CHANGES FINDER: Instantly find recently modified files (faster than find -mtime). "
+        "WHEN TO USE: Investigating recent changes, debugging 'what changed?', reviewing work, finding active files. "
+        "Time-based filtering with simple hour parameter. "
+        "Examples: Last 2 hours → hours=2 | Today's work → hours=24 | Recent Python changes → hours=24, extension='py'. "
+        "Replaces: find -mtime, find -newermt. Essential for tracking codebase activity.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Directory to search in",
+                    "default": ".",
+                },
+                "hours": {
+                    "type": "integer",
+                    "description": "Find files modified within this many hours",
+                    "default": 24,
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["f", "d", "l", "x"],
+                    "description": "Filter by type: f=file, d=directory, l=symlink, x=executable",
+                },
+                "extension": {
+                    "type": "string",
+                    "description": "Filter by file extension",
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of results",
+                    "default": 50,
+                },
             },
-        ),
-        Tool(
-            name="fd_count",
-            description="📊 FAST FILE COUNTER: Quickly count files matching patterns (faster than find | wc -l). "
-            "WHEN TO USE: Getting file counts, analyzing codebase size, inventory checks. "
-            "Examples: Count Python files → pattern='.*', path='.', extension='py' | Count all files → pattern='.*', path='.', type='f' | Count in directory → pattern='.*', path='src/'. "
-            "Replaces: find | wc -l. Simple, fast, accurate.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "pattern": {
-                        "type": "string",
-                        "description": "Search pattern (regex). Use '.*' or '' to match all files.",
-                    },
-                    "path": {
-                        "type": "string",
-                        "description": "Directory to search in (e.g., '.', 'src/', '/home/user/project').",
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["f", "d", "l", "x", "e"],
-                        "description": "Filter by type",
-                    },
-                    "extension": {
-                        "type": "string",
-                        "description": "Filter by extension",
-                    },
-                    "hidden": {
-                        "type": "boolean",
-                        "default": False,
-                    },
-                },
-                "required": ["pattern", "path"],
+            "required": [],
+        },
+    ),
+    Tool(
+        name="fd_count",
+        description="📊 FAST FILE COUNTER: Quickly count files matching patterns (faster than find | wc -l). "
+        "WHEN TO USE: Getting file counts, analyzing codebase size, inventory checks. "
+        "Examples: Count Python files → pattern='.*', path='.', extension='py' | Count all files → pattern='.*', path='.', type='f' | Count in directory → pattern='.*', path='src/'. "
+        "Replaces: find | wc -l. Simple, fast, accurate. "
+        "With stale_ok=true a count up to 60 seconds old may be returned; it misses changes below the top directory.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "pattern": {
+                    "type": "string",
+                    "description": "Search pattern (regex). Use '.*' or '' to match all files.",
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory to search in (e.g., '.', 'src/', '/home/user/project').",
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["f", "d", "l", "x", "e"],
+                    "description": "Filter by type",
+                },
+                "extension": {
+                    "type": "string",
+                    "description": "Filter by extension",
+                },
+                "hidden": {
+                    "type": "boolean",
+                    "default": False,
+                },
+                "stale_ok": {
+                    "type": "boolean",
+                    "description": "Allow reusing the count of an identical call from the last 60 seconds. "
+                    "Only a change to the search directory itself invalidates it, so files added or removed "
+                    "in subdirectories may not be reflected",
+                    "default": False,
+                },
             },
-        ),
-    ]
+            "required": ["pattern", "path"],
+        },
+    ),
+]
 
-    # Only include fd_search_content if ripgrep is available
-    if not RG_CMD:
-        tools = [t for t in tools if t.name != "fd_search_content"]
+# fd_search_content is only offered when ripgrep is installed
+_TOOLS_NO_RG = [t for t in _TOOLS if t.name != "fd_search_content"]
 
-    return tools
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available fd tools."""
+    return _TOOLS if binaries().rg else _TOOLS_NO_RG
 
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
     """Execute fd tool."""
     if name == "fd_search":
+        max_results = arguments.get("max_results", 100)
         cmd = build_fd_command(
             pattern=arguments.get("pattern", ""),
             path=arguments.get("path", "."),
@@ -526,13 +972,13 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             exclude=arguments.get("exclude"),
             case_sensitive=arguments.get("case_sensitive", False),
             absolute_path=arguments.get("absolute_path", False),
+            max_results=max_results + 1,
         )
-        max_results = arguments.get("max_results", 100)
-        output = run_fd(cmd, max_results)
+        output = await run_fd(cmd, max_results)
         return [TextContent(type="text", text=output)]
 
     elif name == "fd_search_content":
-        output = run_fd_with_content_search(
+        output = await run_fd_with_content_search(
             search_pattern=arguments["search_pattern"],
             file_pattern=arguments.get("file_pattern", ""),
             path=arguments.get("path", "."),
@@ -543,11 +989,13 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             case_sensitive=arguments.get("case_sensitive", False),
             context_lines=arguments.get("context_lines", 0),
             max_results=arguments.get("max_results", 100),
+            max_columns=arguments.get("max_columns", 150),
+            max_filesize=arguments.get("max_filesize", "50M"),
         )
         return [TextContent(type="text", text=output)]
 
     elif name == "fd_exec":
-        output = run_fd_exec(
+        output = await run_fd_exec(
             command=arguments["command"],
             pattern=arguments.get("pattern", ""),
             path=arguments.get("path", "."),
@@ -556,11 +1004,12 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             hidden=arguments.get("hidden", False),
             no_ignore=arguments.get("no_ignore", False),
             max_files=arguments.get("max_files", 100),
+            batch=arguments.get("batch", False),
         )
         return [TextContent(type="text", text=output)]
 
     elif name == "fd_recent_files":
-        output = find_recent_files(
+        output = await find_recent_files(
             path=arguments.get("path", "."),
             hours=arguments.get("hours", 24),
             file_type=arguments.get("type"),
@@ -577,19 +1026,37 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             extension=arguments.get("extension"),
             hidden=arguments.get("hidden", False),
         )
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            lines = result.stdout.strip().split("\n") if result.stdout.strip() else []
-            count = len([l for l in lines if l])
-            return [TextContent(type="text", text=f"Found {count} matches")]
-        except Exception as e:
-            return [TextContent(type="text", text=f"Error: {e}")]
+        output = await count_fd(cmd, stale_ok=arguments.get("stale_ok", False))
+        return [TextContent(type="text", text=output)]
 
     return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
+async def prewarm(path: str) -> None:
+    """Walk path once with fd, discarding the output.
+
+    This loads the tree's directory entries and inodes into the kernel's
+    caches, so the first searches the client makes run against a warm tree.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *build_fd_command(path=path, file_type="f"),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await proc.wait()
+    except asyncio.CancelledError:
+        _kill(proc)
+        await proc.wait()
+        raise
+
+
 async def run_server():
     """Run the MCP server with stdio transport."""
+    # Optionally warm the caches for a tree in the background while serving
+    prewarm_path = os.environ.get("FD_MCP_PREWARM")
+    prewarm_task = asyncio.create_task(prewarm(prewarm_path)) if prewarm_path else None
+
     async with stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
@@ -597,14 +1064,27 @@ async def run_server():
             server.create_initialization_options()
         )
 
+    if prewarm_task:
+        prewarm_task.cancel()
+        await asyncio.gather(prewarm_task, return_exceptions=True)
+
 
 def main():
     """Entry point for the MCP server."""
-    if not FD_CMD:
+    if not binaries().fd:
         print("Error: fd/fdfind not found. Please install fd-find.", file=__import__("sys").stderr)
         __import__("sys").exit(1)
 
-    asyncio.run(run_server())
+    # Probe fd's options now, while blocking on a subprocess is still harmless
+    fd_features()
+
+    # uvloop is an optional, faster drop-in event loop (pip install fd-mcp[uvloop])
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(run_server())
+    else:
+        uvloop.run(run_server())
 
 
 if __name__ == "__main__":